@@ -1,18 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from app.database import admin_collection, users_collection
 from app.admin.utils import authenticate_admin, create_access_token, get_current_admin, TokenData
+from app.auth.utils import invalidate_user
 from pydantic import BaseModel, Field
 from datetime import timedelta
 import logging
-from typing import List
-import smtplib
+import orjson
+from typing import List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.config import config
+from app.mailer import smtp_pool, template_env
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (configured once in app.main)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -20,7 +25,7 @@ router = APIRouter()
 # Login route for admin
 @router.post("/login")
 async def login_admin(form_data: OAuth2PasswordRequestForm = Depends()):
-    logger.debug(f"Received login request: username={form_data.username}")
+    logger.debug("Received login request: username=%s", form_data.username)
     try:
         # Authenticate admin using form data (username and password)
         admin = await authenticate_admin(form_data.username, form_data.password)
@@ -31,13 +36,13 @@ async def login_admin(form_data: OAuth2PasswordRequestForm = Depends()):
         # Create access token for the admin
         access_token = create_access_token(data={"sub": admin["username"]}, expires_delta=access_token_expires)
         
-        logger.debug(f"Generated access token for admin: {admin['username']}")
+        logger.debug("Generated access token for admin: %s", admin["username"])
         
         # Return access token with token type
         return {"access_token": access_token, "token_type": "bearer"}
     
     except Exception as e:
-        logger.error(f"Login failed: {e}")
+        logger.error("Login failed: %s", e)
         raise HTTPException(status_code=400, detail="Login failed")
 
 # Response model for statistics
@@ -55,16 +60,35 @@ class UserResponse(BaseModel):
     phone: str
     is_active: bool = Field(default=True)  # Default value for existing users
 
+# Fields needed to build a UserResponse
+USER_LIST_PROJECTION = {"_id": 1, "name": 1, "email": 1, "phone": 1, "is_active": 1}
+
+# Response model for a page of users
+class UserListResponse(BaseModel):
+    items: List[UserResponse]
+    next: Optional[str] = None  # Cursor for the next page, None on the last page
+
 # Response model for uploaded reports
 
-# Endpoint to fetch list of users
-@router.get("/users", response_model=List[UserResponse])
-async def list_users(admin: TokenData = Depends(get_current_admin)):
-    # Retrieve all users from the database
-    users = await users_collection.find().to_list(length=None)
+# Endpoint to fetch list of users, one page at a time
+@router.get("/users", response_model=UserListResponse)
+async def list_users(admin: TokenData = Depends(get_current_admin), limit: int = 50, after: Optional[str] = None):
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 200")
+
+    # Range on _id (always indexed) so each page is an index seek rather than a skip
+    query = {}
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Retrieve one page of users from the database
+    users = await users_collection.find(query, projection=USER_LIST_PROJECTION).sort("_id", 1).limit(limit).to_list(length=limit)
     
     # Map database results to UserResponse model
-    return [UserResponse(
+    items = [UserResponse(
         id=str(user["_id"]),
         name=user["name"],
         email=user["email"],
@@ -72,13 +96,81 @@ async def list_users(admin: TokenData = Depends(get_current_admin)):
         is_active=user.get("is_active", True)  # Default to True if not specified
     ) for user in users]
 
+    # A full page means there may be more users after the last one returned
+    next_cursor = items[-1].id if len(items) == limit else None
+    return UserListResponse(items=items, next=next_cursor)
+
+# Bounds on the number of users sent by one /users/stream response
+STREAM_USERS_DEFAULT_LIMIT = 1000
+STREAM_USERS_MAX_LIMIT = 10000
+
+# Endpoint to stream users as newline-delimited JSON (one user object per line).
+# Each response carries at most `limit` users (default 1000, at most 10000);
+# pass the id on the last line as `after` to fetch the next batch
+@router.get("/users/stream")
+async def stream_users(admin: TokenData = Depends(get_current_admin), limit: int = STREAM_USERS_DEFAULT_LIMIT, after: Optional[str] = None):
+    if limit < 1 or limit > STREAM_USERS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {STREAM_USERS_MAX_LIMIT}")
+
+    # Same _id cursor as list_users; resume from the id on the last line received
+    query = {}
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    cursor = users_collection.find(query, projection=USER_LIST_PROJECTION).sort("_id", 1).limit(limit)
+
+    # Encode each document as it arrives instead of buffering the whole list
+    async def generate():
+        async for user in cursor:
+            yield orjson.dumps({
+                "id": str(user["_id"]),
+                "name": user["name"],
+                "email": user["email"],
+                "phone": user["phone"],
+                "is_active": user.get("is_active", True)  # Default to True if not specified
+            }) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 
 # Request model for user status update (activation/deactivation)
 class UpdateUserStatusRequest(BaseModel):
     reason: str = None  # Optional reason for deactivation
 
+# Notification email templates, compiled once at import
+ACTIVATED_TMPL = template_env.from_string("""
+    <html>
+    <body>
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
+            <h2 style="text-align: center; color: #4CAF50;">Account Activated</h2>
+            <p>Dear {{ name }},</p>
+            <p>Your account has been <strong>activated</strong>. You can now log in and continue using the services.</p>
+            <p>Thank you,<br>The Admin Team,<br>Jivandeep Healthcare</p>
+        </div>
+    </body>
+    </html>
+    """)
+
+DEACTIVATED_TMPL = template_env.from_string("""
+    <html>
+    <body>
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
+            <h2 style="text-align: center; color: #f44336;">Account Deactivated</h2>
+            <p>Dear {{ name }},</p>
+            <p>Your account has been <strong>deactivated</strong> for the following reason:</p>
+            <p style="color: #f44336;"><strong>{{ reason }}</strong></p>
+            <p>If you believe this is a mistake, please contact support.</p>
+            <p>Thank you,<br>The Admin Team,<br>Jivandeep Healthcare</p>
+        </div>
+    </body>
+    </html>
+    """)
+
 # Function to send notification email
-def send_email(user_email: str, subject: str, html_content: str):
+async def send_email(user_email: str, subject: str, html_content: str):
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = config.EMAIL_SENDER
@@ -87,23 +179,16 @@ def send_email(user_email: str, subject: str, html_content: str):
     msg.attach(MIMEText(html_content, "html"))
 
     try:
-        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-            server.starttls()  # Secure the connection
-            server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-            server.sendmail(config.EMAIL_SENDER, [user_email], msg.as_string())
-        logger.info(f"Email sent successfully to {user_email}")
+        async with smtp_pool.acquire() as server:
+            await server.send_message(msg)
+        logger.info("Email sent successfully to %s", user_email)
     
     except Exception as e:
-        logger.error(f"Failed to send email: {e}")
+        logger.error("Failed to send email: %s", e)
 
 # Endpoint to update user status (activate/deactivate)
 @router.post("/users/{user_email}/status")
-async def update_user_status(user_email: str, request: UpdateUserStatusRequest, activate: bool = True, admin: TokenData = Depends(get_current_admin)):
-    # Check if user exists
-    user = await users_collection.find_one({"email": user_email})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def update_user_status(user_email: str, request: UpdateUserStatusRequest, background_tasks: BackgroundTasks, activate: bool = True, admin: TokenData = Depends(get_current_admin)):
     # Prepare data to update in the database
     update_data = {"is_active": activate}
     
@@ -111,43 +196,29 @@ async def update_user_status(user_email: str, request: UpdateUserStatusRequest,
     if not activate and request.reason:
         update_data["deactivation_reason"] = request.reason
     
-    # Update user status in the database
-    await users_collection.update_one({"email": user_email}, {"$set": update_data})
+    # Update user status and fetch the name for the email in a single round-trip
+    user = await users_collection.find_one_and_update(
+        {"email": user_email},
+        {"$set": update_data},
+        projection={"name": 1, "email": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Make sure the next login sees the new status
+    invalidate_user(user_email)
 
     # Prepare and send email notification based on activation status
     if activate:
         subject = "Account Activated - Label-Ai-App"
-        html_content = f"""
-        <html>
-        <body>
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
-                <h2 style="text-align: center; color: #4CAF50;">Account Activated</h2>
-                <p>Dear {user['name']},</p>
-                <p>Your account has been <strong>activated</strong>. You can now log in and continue using the services.</p>
-                <p>Thank you,<br>The Admin Team,<br>Jivandeep Healthcare</p>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = ACTIVATED_TMPL.render(name=user["name"])
     else:
         subject = "Account Deactivated - Label-Ai-App"
-        html_content = f"""
-        <html>
-        <body>
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
-                <h2 style="text-align: center; color: #f44336;">Account Deactivated</h2>
-                <p>Dear {user['name']},</p>
-                <p>Your account has been <strong>deactivated</strong> for the following reason:</p>
-                <p style="color: #f44336;"><strong>{request.reason}</strong></p>
-                <p>If you believe this is a mistake, please contact support.</p>
-                <p>Thank you,<br>The Admin Team,<br>Jivandeep Healthcare</p>
-            </div>
-        </body>
-        </html>
-        """
-
-    # Send notification email to the user
-    send_email(user_email, subject, html_content)
+        html_content = DEACTIVATED_TMPL.render(name=user["name"], reason=request.reason)
+
+    # Send notification email to the user once the response has been flushed
+    background_tasks.add_task(send_email, user_email, subject, html_content)
     
     # Return success message
     return {"message": f"User {'activated' if activate else 'deactivated'} successfully"}
@@ -1,19 +1,87 @@
+import asyncio
+import hmac
 import logging
+from cachetools import TTLCache
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.database import admin_collection
 from app.config import config
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from app.auth.utils import decode_access_token, pwd_context
+from datetime import datetime, timedelta, timezone
+import jwt
+from jwt import InvalidTokenError
 from pydantic import BaseModel
 
 # OAuth2PasswordBearer instance for admin authentication
 oauth2_admin = OAuth2PasswordBearer(tokenUrl="/api/admin/login")
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (configured once in app.main)
 logger = logging.getLogger(__name__)
 
+# Cache of admin documents keyed by username; the admin set is tiny and rarely changes
+_admin_cache = TTLCache(maxsize=128, ttl=300)
+
+# Serializes cache misses so concurrent logins trigger a single Mongo lookup
+_admin_cache_lock = asyncio.Lock()
+
+# Utility function to fetch an admin document, served from cache when possible
+async def get_admin(username: str):
+    """
+    Utility function to fetch an admin document by username.
+
+    Args:
+        username (str): Admin username.
+
+    Returns:
+        dict: Admin document from the cache or the database, or None if not found.
+    """
+    admin = _admin_cache.get(username)
+    if admin is not None:
+        return admin
+
+    async with _admin_cache_lock:
+        # Another request may have filled the cache while we waited
+        admin = _admin_cache.get(username)
+        if admin is None:
+            admin = await admin_collection.find_one({"username": username})
+            if admin:
+                _admin_cache[username] = admin
+
+    return admin
+
+# Utility function to drop a cached admin document
+def invalidate_admin(username: str):
+    """
+    Utility function to remove an admin from the cache.
+
+    Call this whenever an admin document is modified (e.g. password rotation)
+    so the next login reads the updated record.
+
+    Args:
+        username (str): Admin username.
+    """
+    _admin_cache.pop(username, None)
+
+# Utility function to check an admin password against the stored value
+def verify_admin_password(password: str, stored_password: str) -> bool:
+    """
+    Utility function to verify an admin password.
+
+    Stored values are expected to be bcrypt hashes. Legacy plaintext records
+    are still accepted, compared in constant time; authenticate_admin re-hashes
+    them on the first successful login.
+
+    Args:
+        password (str): Password supplied at login.
+        stored_password (str): Password value from the admin document.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    if pwd_context.identify(stored_password, required=False):
+        return pwd_context.verify(password, stored_password)
+    return hmac.compare_digest(password.encode(), stored_password.encode())
+
 # Utility function to authenticate admin
 async def authenticate_admin(username: str, password: str):
     """
@@ -29,15 +97,25 @@ async def authenticate_admin(username: str, password: str):
     Raises:
         HTTPException: If admin credentials are invalid (status_code 401).
     """
-    # Query admin collection for given username
-    admin = await admin_collection.find_one({"username": username})
+    # Look up admin by username (cached)
+    admin = await get_admin(username)
     
     # Check if admin exists and password matches
-    if not admin or admin['password'] != password:
-        logger.error(f"Invalid credentials for user: {username}")
+    if not admin or not verify_admin_password(password, admin['password']):
+        logger.error("Invalid credentials for user: %s", username)
         # Raise HTTPException for unauthorized access
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Replace a legacy plaintext password with its bcrypt hash; the filter on the
+    # old value leaves the record alone if it was changed in the meantime
+    if not pwd_context.identify(admin['password'], required=False):
+        await admin_collection.update_one(
+            {"_id": admin["_id"], "password": admin["password"]},
+            {"$set": {"password": pwd_context.hash(password)}}
+        )
+        invalidate_admin(username)
+        logger.info("Re-hashed plaintext password for admin: %s", username)
+    
     return admin
 
 # Function to create access token
@@ -57,9 +135,9 @@ def create_access_token(data: dict, expires_delta: timedelta = 18000):
     
     # Calculate token expiration time
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=300)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=300)
     
     # Update payload with expiration time
     to_encode.update({"exp": expire})
@@ -93,7 +171,6 @@ async def get_current_admin(request: Request, token: str = Depends(oauth2_admin)
     """
     # Try to get token from cookies or header
     token = request.cookies.get('access_token') or token
-    logger.debug(f"Received token: {token}")
     
     # Exception to raise for credentials validation failure
     credentials_exception = HTTPException(
@@ -103,9 +180,9 @@ async def get_current_admin(request: Request, token: str = Depends(oauth2_admin)
     )
     
     try:
-        # Decode JWT token payload
-        payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
-        logger.debug(f"Decoded payload: {payload}")
+        # Decode JWT token payload (recently verified tokens are served from cache)
+        payload = decode_access_token(token)
+        logger.debug("Decoded token for subject: %s", payload.get("sub"))
         
         # Get subject (username) from decoded payload
         username: str = payload.get("sub")
@@ -117,9 +194,9 @@ async def get_current_admin(request: Request, token: str = Depends(oauth2_admin)
         # Create TokenData instance with username
         token_data = TokenData(username=username)
     
-    except JWTError as e:
+    except InvalidTokenError as e:
         # Log JWT decoding error
-        logger.error(f"JWT error: {e}")
+        logger.error("JWT error: %s", e)
         
         # Raise exception for JWT validation failure
         raise credentials_exception
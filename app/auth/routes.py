@@ -1,23 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, Response, Request
+from fastapi import APIRouter, HTTPException, Depends, Response, Request, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
-from app.database import users_collection
+from app.database import users_collection, password_resets_collection
 from app.auth.schemas import DoctorCreate, Token, UserInDB
-from app.auth.utils import get_password_hash, verify_password, create_access_token, authenticate_user, generate_verification_code, send_verification_code, ForgotPasswordRequest, VerifyCodeRequest, ResetPasswordRequest
-from datetime import timedelta, datetime
+from app.auth.utils import get_password_hash, verify_password, create_access_token, authenticate_user, get_auth_user, invalidate_user, generate_verification_code, send_verification_code, ForgotPasswordRequest, VerifyCodeRequest, ResetPasswordRequest
+from datetime import timedelta, datetime, timezone
 
 
 router = APIRouter()
 
 @router.post("/register", response_model=dict)
 async def register(doctor: DoctorCreate):
-    existing_user = await users_collection.find_one({"email": doctor.email})
+    existing_user = await get_auth_user(doctor.email)
     if existing_user:
         if not existing_user.get("is_active", True):
             raise HTTPException(status_code=400, detail="Your account has been deactivated. Please contact support at gangeshsonu2004@gmail.com.")
         raise HTTPException(status_code=400, detail="Email already registered")
     
     hashed_password = get_password_hash(doctor.password)
-    doctor_dict = doctor.dict()
+    doctor_dict = doctor.model_dump()
     doctor_dict["password"] = hashed_password
     doctor_dict["is_active"] = True  # Ensure new users are active by default
     
@@ -35,51 +35,57 @@ async def login_for_access_token(response: Response, form_data: OAuth2PasswordRe
         raise HTTPException(status_code=403, detail="Your account has been deactivated. Please contact support at gangeshsonu2004@gmail.com.")
     
     access_token_expires = timedelta(minutes=1440)
-    access_token = create_access_token(data={"sub": user["email"]}, expires_delta=access_token_expires)
+    access_token = create_access_token(data={"sub": user["email"], "uid": str(user["_id"])}, expires_delta=access_token_expires)
     
     response.set_cookie(key="access_token", value=access_token, httponly=True, secure=True, samesite="None")
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest):
-    user = await users_collection.find_one({"email": request.email})
+async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks):
+    user = await users_collection.find_one({"email": request.email}, projection={"_id": 1})
     if not user:
         raise HTTPException(status_code=400, detail="Email not registered")
 
+    # Store the code in password_resets; its TTL index removes it after expiry
     verification_code = generate_verification_code()
-    await users_collection.update_one(
-        {"email": request.email},
-        {"$set": {"verification_code": verification_code, "code_expiry": datetime.utcnow() + timedelta(minutes=10)}}
+    await password_resets_collection.update_one(
+        {"_id": request.email},
+        {"$set": {"code": verification_code, "expires_at": datetime.now(timezone.utc) + timedelta(minutes=10)}},
+        upsert=True
     )
 
-    await send_verification_code(request.email, verification_code)
+    # Deliver the code after the response is sent so SMTP I/O doesn't hold up the request
+    background_tasks.add_task(send_verification_code, request.email, verification_code)
     return {"message": "Verification code sent to email"}
 
 @router.post("/verify-code")
 async def verify_code(request: VerifyCodeRequest):
-    user = await users_collection.find_one({"email": request.email})
-    if not user:
-        raise HTTPException(status_code=400, detail="Invalid email or code")
-    
-    if user.get("verification_code") != request.code or datetime.utcnow() > user.get("code_expiry"):
+    # The TTL monitor runs about once a minute, so still check expires_at explicitly
+    reset = await password_resets_collection.find_one(
+        {"_id": request.email, "code": request.code, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+        projection={"_id": 1}
+    )
+    if not reset:
         raise HTTPException(status_code=400, detail="Invalid or expired code")
     
     return {"message": "Code verified successfully"}
 
 @router.post("/reset-password")
 async def reset_password(request: ResetPasswordRequest):
-    user = await users_collection.find_one({"email": request.email})
-    if not user:
-        raise HTTPException(status_code=400, detail="Invalid email or code")
-
-    if user.get("verification_code") != request.code or datetime.utcnow() > user.get("code_expiry"):
+    # Validate and consume the code in one atomic operation
+    reset = await password_resets_collection.find_one_and_delete(
+        {"_id": request.email, "code": request.code, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+        projection={"_id": 1}
+    )
+    if not reset:
         raise HTTPException(status_code=400, detail="Invalid or expired code")
 
     hashed_password = get_password_hash(request.new_password)
     await users_collection.update_one(
         {"email": request.email},
-        {"$set": {"password": hashed_password}, "$unset": {"verification_code": "", "code_expiry": ""}}
+        {"$set": {"password": hashed_password}}
     )
+    invalidate_user(request.email)
 
     return {"message": "Password reset successfully"}
\ No newline at end of file
@@ -1,15 +1,27 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import jwt
+from jwt import InvalidTokenError
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
 from app.config import config  # Assuming this imports your project's configuration
-import random
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import logging
+import secrets
+import hashlib
+import threading
+import time
+from cachetools import TTLCache
+from bson import ObjectId
+from bson.errors import InvalidId
+from email import policy
+from email.message import EmailMessage
 from app.database import users_collection  # Assuming you have a users_collection for users
+from app.mailer import smtp_pool, template_env
+
+# Set up logging (configured once in app.main)
+logger = logging.getLogger(__name__)
 
 # OAuth2PasswordBearer instance for token management
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -17,9 +29,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 # Pydantic model for token data
 class TokenData(BaseModel):
     username: str 
+    user_id: Optional[str] = None
 
 # CryptContext for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor: 12 rounds by default; drop to 10 if login CPU becomes a bottleneck
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
 
 # Function to verify a plain password against a hashed password
 def verify_password(plain_password, hashed_password):
@@ -33,23 +47,66 @@ def get_password_hash(password):
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=1440)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=1440)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
     return encoded_jwt
 
+# Cache of verified JWT payloads keyed by a hash of the token, so repeat
+# requests with the same token skip signature verification
+JWT_CACHE_TTL = 30  # seconds
+_jwt_cache = TTLCache(maxsize=10000, ttl=JWT_CACHE_TTL)
+_jwt_cache_lock = threading.Lock()
+
+# Function to decode and verify a JWT, reusing recently verified payloads
+def decode_access_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).hexdigest()[:32]
+    now = time.time()
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(key)
+    if cached is not None:
+        payload, expires_at = cached
+        if now < expires_at:
+            return payload
+    payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+    # Never serve a cached payload past the token's own expiry
+    expires_at = min(now + JWT_CACHE_TTL, payload.get("exp", float("inf")))
+    with _jwt_cache_lock:
+        _jwt_cache[key] = (payload, expires_at)
+    return payload
+
+# Fields needed to authenticate a user and check their account status
+AUTH_PROJECTION = {"email": 1, "password": 1, "is_active": 1}
+
 # Function to retrieve a user from the database by email
 def get_user(username: str):
-    user = users_collection.find_one({"email": username})
+    user = users_collection.find_one({"email": username}, projection=AUTH_PROJECTION)
     if user:
         return user
     return None
 
+# Short-lived cache of the auth fields (email, password hash, is_active) by email;
+# invalidate_user must be called whenever those fields change
+_user_cache = TTLCache(maxsize=5000, ttl=60)
+
+# Asynchronous function to fetch a user's auth fields, served from cache when possible
+async def get_auth_user(email: str):
+    user = _user_cache.get(email)
+    if user is None:
+        user = await users_collection.find_one({"email": email}, projection=AUTH_PROJECTION)
+        if user:
+            _user_cache[email] = user
+    return user
+
+# Function to drop a user's cached auth fields after a status or password change
+def invalidate_user(email: str):
+    _user_cache.pop(email, None)
+
 # Asynchronous function to authenticate a user based on username and password
 async def authenticate_user(username: str, password: str):
-    user = await users_collection.find_one({"email": username})
+    user = await get_auth_user(username)
     if not user:
         return False
     if not verify_password(password, user["password"]):
@@ -65,15 +122,32 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
+    except InvalidTokenError:
         raise credentials_exception
     return token_data
 
+# Function to get the current user's id as an ObjectId, converted once per request
+async def get_current_user_id(current_user: TokenData = Depends(get_current_user)) -> ObjectId:
+    if current_user.user_id:
+        try:
+            return ObjectId(current_user.user_id)
+        except InvalidId:
+            pass
+    # Tokens issued before the uid claim existed only carry the email
+    user = await get_auth_user(current_user.username)
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user["_id"]
+
 # Pydantic models for password reset request and verification code request
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
@@ -88,86 +162,115 @@ class ResetPasswordRequest(BaseModel):
     code: str
     new_password: str 
     
-# Function to generate a random 6-digit verification code
+# Function to generate a random 6-digit verification code from the OS CSPRNG
 def generate_verification_code():
-    return str(random.randint(100000, 999999))
+    return f"{secrets.randbelow(900000) + 100000:06d}"
 
-# Asynchronous function to send a verification code via email
-async def send_verification_code(email: str, code: str):
-    # HTML email content with the verification code
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            .email-container {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                padding: 20px;
-                max-width: 600px;
-                margin: 0 auto;
-                border: 1px solid #ddd;
-                border-radius: 10px;
-            }}
-            .email-header {{
-                background-color: #f4f4f4;
-                padding: 20px;
-                text-align: center;
-                border-bottom: 1px solid #ddd;
-            }}
-            .email-body {{
-                padding: 20px;
-            }}
-            .email-footer {{
-                background-color: #f4f4f4;
-                padding: 10px;
-                text-align: center;
-                font-size: 12px;
-                color: #777;
-                border-top: 1px solid #ddd;
-            }}
-            .verification-code {{
-                font-size: 24px;
-                font-weight: bold;
-                text-align: center;
-                margin: 20px 0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="email-container">
-            <div class="email-header">
-                <h1>Password Reset Verification Code</h1>
-            </div>
-            <div class="email-body">
-                <p>Dear User,</p>
-                <p>You have requested to reset your password. Please use the following verification code to proceed:</p>
-                <div class="verification-code">{code}</div>
-                <p>This code is valid for 10 minutes. If you did not request a password reset, please ignore this email.</p>
-            </div>
-            <div class="email-footer">
-                <p>Thank You,<br>Jivandeep Healthcare</p>
-            </div>
+# Password reset email template, compiled once at import
+VERIFICATION_CODE_TMPL = template_env.from_string("""
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        .email-container {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            padding: 20px;
+            max-width: 600px;
+            margin: 0 auto;
+            border: 1px solid #ddd;
+            border-radius: 10px;
+        }
+        .email-header {
+            background-color: #f4f4f4;
+            padding: 20px;
+            text-align: center;
+            border-bottom: 1px solid #ddd;
+        }
+        .email-body {
+            padding: 20px;
+        }
+        .email-footer {
+            background-color: #f4f4f4;
+            padding: 10px;
+            text-align: center;
+            font-size: 12px;
+            color: #777;
+            border-top: 1px solid #ddd;
+        }
+        .verification-code {
+            font-size: 24px;
+            font-weight: bold;
+            text-align: center;
+            margin: 20px 0;
+        }
+    </style>
+</head>
+<body>
+    <div class="email-container">
+        <div class="email-header">
+            <h1>Password Reset Verification Code</h1>
         </div>
-    </body>
-    </html>
-    """
-    
-    # Create the email message
-    msg = MIMEMultipart("alternative")
+        <div class="email-body">
+            <p>Dear User,</p>
+            <p>You have requested to reset your password. Please use the following verification code to proceed:</p>
+            <div class="verification-code">{{ code }}</div>
+            <p>This code is valid for 10 minutes. If you did not request a password reset, please ignore this email.</p>
+        </div>
+        <div class="email-footer">
+            <p>Thank You,<br>Jivandeep Healthcare</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+# Placeholder spliced into the pre-serialized verification email at send time
+_CODE_PLACEHOLDER = "__VERIFICATION_CODE__"
+
+# Function to build the verification email once, as wire-ready bytes; the To
+# header is added per recipient by send_verification_code
+def _build_verification_message() -> bytes:
+    msg = EmailMessage()
     msg["Subject"] = "Label Ai App Password Reset Verification Code"
     msg["From"] = config.EMAIL_SENDER
-    msg["To"] = email
-    
-    # Attach the HTML content
-    msg.attach(MIMEText(html_content, "html"))
+
+    # 7bit keeps the body unencoded so the code placeholder survives serialization
+    msg.set_content(VERIFICATION_CODE_TMPL.render(code=_CODE_PLACEHOLDER), subtype="html", cte="7bit")
+    return msg.as_bytes(policy=policy.SMTP)
+
+# Verification email without a To header and with the code left to fill in
+_VERIFICATION_MESSAGE = _build_verification_message()
+
+# Function to convert a recipient to a plain ASCII address usable in a 7bit
+# message and the SMTP envelope; rejects anything that could inject headers
+def _ascii_recipient(email: str) -> str:
+    if "\r" in email or "\n" in email:
+        raise ValueError("Recipient address contains a line break")
+    local, at, domain = email.rpartition("@")
+    if not at or not local or not local.isascii():
+        raise ValueError("Recipient address must have an ASCII local part")
+    return f"{local}@{domain.encode('idna').decode('ascii')}"
+
+# Asynchronous function to send a verification code via email
+async def send_verification_code(email: str, code: str):
+    try:
+        recipient = _ascii_recipient(email)
+    except (ValueError, UnicodeError) as e:
+        logger.error("Not sending verification code to %r: %s", email, e)
+        return
+
+    # Prepend the recipient's To header and fill in the code; every other
+    # header and the body are fixed
+    message = (
+        policy.SMTP.fold_binary("To", recipient)
+        + _VERIFICATION_MESSAGE.replace(_CODE_PLACEHOLDER.encode(), code.encode())
+    )
 
     try:
-        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-            server.starttls()  # Secure the connection
-            server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-            server.sendmail(config.EMAIL_SENDER, [email], msg.as_string())
-        print("Email sent successfully")
+        async with smtp_pool.acquire() as server:
+            await server.sendmail(config.EMAIL_SENDER, [recipient], message)
+        logger.info("Verification code sent to %s", recipient)
     except Exception as e:
-        print(f"Failed to send email: {e}")
+        logger.error("Failed to send email: %s", e)
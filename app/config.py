@@ -9,6 +9,9 @@ class Config:
     MONGO_URI = os.getenv("MONGO_URI")                      # MongoDB URI
     MONGO_DB = os.getenv("MONGO_DB")                        # MongoDB database name
 
+    # Logging configuration
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()      # Root log level (e.g. DEBUG, INFO)
+
     # JWT configuration
     JWT_SECRET = os.getenv("JWT_SECRET")                    # JWT secret key
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")              # JWT algorithm
@@ -16,7 +19,7 @@ class Config:
     # Email configuration
     EMAIL_SENDER = os.getenv("EMAIL_SENDER")                # Sender email address
     SMTP_SERVER = os.getenv("SMTP_SERVER")                  # SMTP server address
-    SMTP_PORT = os.getenv("SMTP_PORT")                      # SMTP server port
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))          # SMTP server port (parsed once)
     SMTP_USERNAME = os.getenv("SMTP_USERNAME")              # SMTP username
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")              # SMTP password
 
@@ -24,5 +27,13 @@ class Config:
     # GOOGLE_SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")  # Path to the Google service account file
     # GOOGLE_DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID")            # Google Drive folder ID
 
+# Settings the app cannot run without
+REQUIRED_SETTINGS = ("MONGO_URI", "MONGO_DB", "JWT_SECRET", "JWT_ALGORITHM")
+
+# Fail fast at import instead of on the first request that needs a missing value
+missing_settings = [name for name in REQUIRED_SETTINGS if not getattr(Config, name)]
+if missing_settings:
+    raise RuntimeError(f"Missing required environment variables: {', '.join(missing_settings)}")
+
 # Create an instance of the Config class
 config = Config()
@@ -1,8 +1,20 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import logging
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
 from .config import config
 
+logger = logging.getLogger(__name__)
+
 # Initialize the AsyncIOMotorClient with the MongoDB URI from the config
-client = AsyncIOMotorClient(config.MONGO_URI)
+client = AsyncIOMotorClient(
+    config.MONGO_URI,
+    maxPoolSize=50,                 # Upper bound on concurrent sockets per worker
+    minPoolSize=10,                 # Keep sockets warm so requests skip connection setup
+    compressors="zstd,zlib",        # Wire compression; zlib covers servers without zstd
+    serverSelectionTimeoutMS=3000,  # Fail fast instead of hanging 30s when Mongo is down
+    appname="alas",                 # Identifies this app in server logs and currentOp
+)
 
 # Access the specified database from the client
 database = client[config.MONGO_DB]
@@ -20,3 +32,44 @@ teachers_collection = database.get_collection("teachers")
 
 # Questions and Answers collection
 questions_collection = database.get_collection("qna")
+
+# Password Resets Collection: One pending verification code per email, expired by a TTL index
+password_resets_collection = database.get_collection("password_resets")
+
+# Create the indexes the auth and QnA routes rely on (idempotent, run at startup)
+# Cursor pagination on users ranges over _id, which MongoDB always indexes
+# Create indexes on a collection; a failed build (typically a unique index over
+# existing duplicates) is logged instead of stopping the app from starting
+async def _create_indexes(collection, indexes):
+    try:
+        await collection.create_indexes(indexes)
+    except OperationFailure as e:
+        logger.error("Could not create indexes on %s (run scripts.dedupe_unique_keys if duplicates exist): %s", collection.name, e)
+
+async def init_indexes():
+    # Every user auth route looks users up by email
+    await _create_indexes(users_collection, [IndexModel([("email", 1)], unique=True)])
+
+    # Admin login looks admins up by username
+    await _create_indexes(admin_collection, [IndexModel([("username", 1)], unique=True)])
+
+    # Let MongoDB delete verification codes once they pass expires_at
+    await _create_indexes(password_resets_collection, [IndexModel([("expires_at", 1)], expireAfterSeconds=0)])
+
+    # Query shapes used by get_next_questions / recommend_next_question
+    # (the QnA helpers read the "questions" collection)
+    await _create_indexes(database.questions, [
+        IndexModel([("topic", 1), ("difficulty", 1), ("priority", 1)]),
+        IndexModel([("skills", 1), ("priority", 1)]),
+        IndexModel([("subject", 1), ("topic", 1), ("difficulty", 1)]),
+        IndexModel([("topic", 1), ("difficulty_rank", 1)]),
+    ])
+
+    # One progress document per user, looked up on every QnA request
+    await _create_indexes(database.user_progress, [IndexModel([("user_id", 1)], unique=True)])
+
+    # Per-question attempt/completion records, checked for every candidate question
+    await _create_indexes(database.user_completions, [IndexModel([("user_id", 1), ("question_id", 1)], unique=True)])
+
+    # A user's answer history, newest first
+    await _create_indexes(database.user_answers, [IndexModel([("user_id", 1), ("timestamp", -1)])])
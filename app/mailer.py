@@ -0,0 +1,98 @@
+import logging
+from contextlib import asynccontextmanager
+import aiosmtplib
+from jinja2 import Environment, select_autoescape
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+# Jinja2 environment for email bodies; templates built from it are compiled
+# once at import and HTML-escape their variables
+template_env = Environment(autoescape=select_autoescape(["html"]))
+
+# Maximum number of idle SMTP connections kept open
+POOL_SIZE = 5
+
+# Number of messages sent over one connection before it is recycled
+# (most providers cap messages per session)
+MAX_SENDS_PER_CONNECTION = 100
+
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated aiosmtplib connections reused across email sends.
+
+    Opening a session costs a TLS handshake plus AUTH, which dominates the
+    time spent per email; connections are therefore kept open and handed out
+    again after each send. All SMTP I/O is awaited, so sending never blocks
+    the event loop.
+    """
+
+    def __init__(self, host: str, port, username: str, password: str, size: int = POOL_SIZE, max_sends: int = MAX_SENDS_PER_CONNECTION):
+        self.key = (host, port, username)
+        self._password = password
+        self._size = size
+        self._max_sends = max_sends
+        # List of (server, sends) tuples; only touched from the event loop
+        # between awaits, so it needs no lock
+        self._idle = []
+
+    async def _connect(self):
+        host, port, username = self.key
+        server = aiosmtplib.SMTP(hostname=host, port=port, start_tls=True)
+        await server.connect()  # Connects and secures the connection
+        await server.login(username, self._password)
+        return server
+
+    @staticmethod
+    async def _quit(server):
+        try:
+            await server.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            server.close()
+
+    async def _checkout(self):
+        # Reuse an idle connection if it still answers NOOP, otherwise reconnect
+        while self._idle:
+            server, sends = self._idle.pop()
+            try:
+                if (await server.noop()).code == 250:
+                    return server, sends
+            except (aiosmtplib.SMTPException, OSError):
+                pass
+            await self._quit(server)
+        return await self._connect(), 0
+
+    async def _checkin(self, server, sends: int):
+        if sends < self._max_sends and len(self._idle) < self._size:
+            self._idle.append((server, sends))
+        else:
+            await self._quit(server)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Async context manager yielding an authenticated SMTP connection.
+
+        The connection is returned to the pool when the block exits normally
+        and discarded if the block raises.
+        """
+        server, sends = await self._checkout()
+        try:
+            yield server
+        except BaseException:
+            server.close()  # Don't await a polite QUIT on a failed or cancelled send
+            raise
+        await self._checkin(server, sends + 1)
+
+    async def close(self):
+        """
+        Close all idle connections (called on application shutdown).
+        """
+        idle, self._idle = self._idle, []
+        for server, _ in idle:
+            await self._quit(server)
+
+
+# Shared pool used by all email senders
+smtp_pool = SMTPConnectionPool(config.SMTP_SERVER, config.SMTP_PORT, config.SMTP_USERNAME, config.SMTP_PASSWORD)
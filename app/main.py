@@ -1,14 +1,32 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .config import config
+
+# Configure logging once for the whole app; LOG_LEVEL=DEBUG enables debug logs
+logging.basicConfig(level=config.LOG_LEVEL)
+
 # Importing route modules from different submodules
 from .auth.routes import router as auth_router
 # from .profile.routes import router as profile_router
 from .qna.routes import router as qna_router
 from .admin.routes import router as admin_router
+from .mailer import smtp_pool
+from .database import init_indexes
+
+# Startup and shutdown work for the app's lifetime
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Ensure MongoDB indexes exist before serving requests
+    await init_indexes()
+    yield
+    # Close pooled SMTP connections when the app shuts down
+    await smtp_pool.close()
 
 # Create an instance of the FastAPI class
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # List of allowed origins for CORS
 origins = [
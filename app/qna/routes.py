@@ -1,8 +1,11 @@
+import asyncio
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 from bson import ObjectId
-from pymongo.collection import Collection
-from pymongo.database import Database
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 
 # Import the database object directly instead of get_database function
 from app.database import database, questions_collection
@@ -11,23 +14,45 @@ from app.qna.utils import (
     get_next_questions,
     save_user_answer,
     format_question_response,
+    format_progress_response,
     get_user_progress,
     recommend_next_question,
     calculate_user_performance
 )
-from app.auth.utils import get_current_user
+from app.auth.utils import get_current_user_id
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Create a dependency function that returns the database
-async def get_database():
+# Create a dependency function that returns the (Motor) database
+async def get_database() -> AsyncIOMotorDatabase:
     return database
 
+# Dependency converting the question_id path parameter to an ObjectId once per request
+async def get_question_object_id(question_id: str) -> ObjectId:
+    try:
+        return ObjectId(question_id)
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid question id"
+        )
+
+# Log a database failure and turn it into a 503; other errors (including
+# request cancellation) are left to propagate
+def database_unavailable(error: PyMongoError) -> HTTPException:
+    logger.error("Database error: %s", error)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database unavailable"
+    )
+
 @router.get("/questions/{question_id}", response_model=dict)
 async def get_question(
-    question_id: str,
-    db: Database = Depends(get_database),
-    current_user: dict = Depends(get_current_user)
+    question_id: ObjectId = Depends(get_question_object_id),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    user_id: ObjectId = Depends(get_current_user_id)
 ):
     """
     Retrieve a specific question by ID.
@@ -40,11 +65,8 @@ async def get_question(
                 detail="Question not found"
             )
         return format_question_response(question)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    except PyMongoError as e:
+        raise database_unavailable(e)
 
 
 
@@ -54,8 +76,8 @@ async def get_stack_of_questions(
     difficulty: Optional[str] = None,
     subject: Optional[str] = None,
     topic: Optional[str] = None,
-    db: Database = Depends(get_database),
-    current_user: dict = Depends(get_current_user)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    user_id: ObjectId = Depends(get_current_user_id)
 ):
     """
     Get next 'count' questions stacked for the user based on optional filters.
@@ -67,19 +89,22 @@ async def get_stack_of_questions(
             detail="Count must be between 1 and 10"
         )
     
-    # Get user's progress to determine appropriate questions
-    user_progress = await get_user_progress(db, current_user["_id"])
-    
-    # Get next questions based on user's progress and any filters
-    questions = await get_next_questions(
-        db, 
-        user_id=current_user["_id"],
-        count=count,
-        difficulty=difficulty,
-        subject=subject,
-        topic=topic,
-        user_progress=user_progress
-    )
+    try:
+        # Get user's progress to determine appropriate questions
+        user_progress = await get_user_progress(db, user_id)
+        
+        # Get next questions based on user's progress and any filters
+        questions = await get_next_questions(
+            db, 
+            user_id=user_id,
+            count=count,
+            difficulty=difficulty,
+            subject=subject,
+            topic=topic,
+            user_progress=user_progress
+        )
+    except PyMongoError as e:
+        raise database_unavailable(e)
     
     if not questions:
         raise HTTPException(
@@ -93,16 +118,16 @@ async def get_stack_of_questions(
 
 @router.post("/questions/{question_id}/answer", response_model=dict)
 async def submit_answer(
-    question_id: str,
     answer_data: dict,
-    db: Database = Depends(get_database),
-    current_user: dict = Depends(get_current_user)
+    question_id: ObjectId = Depends(get_question_object_id),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    user_id: ObjectId = Depends(get_current_user_id)
 ):
     """
     Save user's answer to a question and return feedback/result.
     """
     try:
-        # Verify the question exists
+        # Verify the question exists; it is fetched once and reused below
         question = await get_question_by_id(db, question_id)
         if not question:
             raise HTTPException(
@@ -113,21 +138,24 @@ async def submit_answer(
         # Save the user's answer
         result = await save_user_answer(
             db,
-            user_id=current_user["_id"],
+            user_id=user_id,
             question_id=question_id,
             user_answer=answer_data.get("answer"),
-            time_taken=answer_data.get("time_taken", 0)
+            time_taken=answer_data.get("time_taken", 0),
+            question=question
         )
         
-        # Calculate user performance metrics
-        performance = await calculate_user_performance(db, current_user["_id"])
-        
-        # Get recommendation for next question
-        next_question_id = await recommend_next_question(
-            db, 
-            user_id=current_user["_id"],
-            current_question_id=question_id,
-            result=result
+        # Calculate user performance metrics and pick the next question concurrently;
+        # neither depends on the other, so their Mongo round-trips overlap
+        performance, next_question_id = await asyncio.gather(
+            calculate_user_performance(db, user_id, progress=result["progress"]),
+            recommend_next_question(
+                db, 
+                user_id=user_id,
+                current_question_id=question_id,
+                result=result,
+                current_question=question
+            )
         )
         
         response = {
@@ -139,30 +167,29 @@ async def submit_answer(
         }
         
         return response
-    except Exception as e:
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except PyMongoError as e:
+        raise database_unavailable(e)
 
 @router.get("/progress", response_model=dict)
 async def get_learning_progress(
-    db: Database = Depends(get_database),
-    current_user: dict = Depends(get_current_user)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    user_id: ObjectId = Depends(get_current_user_id)
 ):
     """
     Get the user's learning progress and statistics.
     """
     try:
-        progress = await get_user_progress(db, current_user["_id"])
-        performance = await calculate_user_performance(db, current_user["_id"])
+        progress = await get_user_progress(db, user_id)
+        performance = await calculate_user_performance(db, user_id, progress=progress)
         
         return {
-            "progress": progress,
+            "progress": format_progress_response(progress),
             "performance": performance
         }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
\ No newline at end of file
+    except PyMongoError as e:
+        raise database_unavailable(e)
\ No newline at end of file
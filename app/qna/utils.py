@@ -1,24 +1,81 @@
+import logging
 from typing import List, Dict, Optional, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from bson import ObjectId
-from pymongo.database import Database
+from cachetools import TTLCache
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
-async def get_question_by_id(db: Database, question_id: str) -> Dict:
+logger = logging.getLogger(__name__)
+
+# Question fields that reveal the answer and must never reach the client
+SENSITIVE_QUESTION_FIELDS = {"correct_answer", "explanations"}
+
+# Fields save_user_answer needs to grade an answer and update skill progress
+GRADING_PROJECTION = {"type": 1, "correct_answer": 1, "explanations": 1, "explanation": 1, "points": 1, "skills": 1}
+
+# Numeric order of the difficulty labels; questions store it as difficulty_rank
+# so "harder"/"easier" queries compare ranks instead of strings
+DIFFICULTY_RANKS = {"easy": 1, "medium": 2, "hard": 3}
+
+# How many random questions the last fallback tier samples per question requested
+RANDOM_TIER_OVERSAMPLE = 4
+
+# In-process cache of question documents keyed by question id; questions are
+# effectively immutable, so entries live for an hour unless invalidated
+_question_cache = TTLCache(maxsize=4096, ttl=3600)
+
+# Short-lived cache of get_next_questions results; keys include the user's
+# progress_version, so answering a question makes older entries unreachable
+_next_questions_cache = TTLCache(maxsize=4096, ttl=60)
+
+def invalidate_question(question_id) -> None:
     """
-    Retrieve a question by its ID.
+    Drop a question from the cache; call after editing or deleting it.
     """
-    try:
-        # Convert string ID to ObjectId
-        object_id = ObjectId(question_id)
-        question = await db.questions.find_one({"_id": object_id})
+    _question_cache.pop(ObjectId(question_id), None)
+
+async def get_question_by_id(db: AsyncIOMotorDatabase, question_id: ObjectId) -> Dict:
+    """
+    Retrieve a question by its ID, served from the in-process cache when possible.
+    The returned document is shared with the cache and must not be mutated.
+    """
+    question = _question_cache.get(question_id)
+    if question is not None:
         return question
-    except Exception as e:
-        print(f"Error retrieving question: {e}")
-        return None
+    
+    question = await db.questions.find_one({"_id": question_id})
+    if question:
+        _question_cache[question_id] = question
+    return question
+
+def exclude_completed_stages(db: AsyncIOMotorDatabase, user_id: ObjectId) -> List[Dict]:
+    """
+    Aggregation stages dropping questions the user has already answered correctly.
+    Each candidate costs one index seek on user_completions (user_id, question_id).
+    """
+    return [
+        {"$lookup": {
+            "from": db.user_completions.name,
+            "let": {"question_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$user_id", user_id]},
+                    {"$eq": ["$question_id", "$$question_id"]},
+                    {"$eq": ["$completed", True]}
+                ]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "_completion"
+        }},
+        {"$match": {"_completion": {"$size": 0}}},
+        {"$unset": "_completion"}
+    ]
 
 async def get_next_questions(
-    db: Database, 
-    user_id: str,
+    db: AsyncIOMotorDatabase, 
+    user_id: ObjectId,
     count: int = 3,
     difficulty: Optional[str] = None,
     subject: Optional[str] = None,
@@ -27,7 +84,14 @@ async def get_next_questions(
 ) -> List[Dict]:
     """
     Get the next stack of questions for a user based on filters and adaptive learning.
+    Results are cached briefly per progress version and must not be mutated.
     """
+    progress_version = (user_progress or {}).get("progress_version", 0)
+    cache_key = (user_id, difficulty, subject, topic, count, progress_version)
+    questions = _next_questions_cache.get(cache_key)
+    if questions is not None:
+        return questions
+    
     # Build the query based on provided filters
     query = {}
     
@@ -38,10 +102,6 @@ async def get_next_questions(
     if topic:
         query["topic"] = topic
     
-    # Exclude questions the user has already answered correctly
-    if user_progress and "completed_questions" in user_progress:
-        query["_id"] = {"$nin": [ObjectId(q_id) for q_id in user_progress["completed_questions"]]}
-    
     # Sort by priority if available, otherwise use default order
     sort_criteria = [("priority", 1)]
     
@@ -58,51 +118,101 @@ async def get_next_questions(
             weakest_skill = weak_skills[0][0]
             query["skills"] = weakest_skill
             
-    # Find questions matching criteria
-    cursor = db.questions.find(query).sort(sort_criteria).limit(count)
-    questions = await cursor.to_list(length=count)
-    
-    # If we don't have enough questions, remove some filters and try again
-    if len(questions) < count:
-        # Remove topic filter if it exists
-        if "topic" in query:
-            del query["topic"]
-            cursor = db.questions.find(query).sort(sort_criteria).limit(count - len(questions))
-            additional_questions = await cursor.to_list(length=count - len(questions))
-            questions.extend(additional_questions)
-    
-    # If we still don't have enough questions, get random ones
-    if len(questions) < count:
-        # Ensure we don't get duplicates
-        existing_ids = [q["_id"] for q in questions]
-        random_query = {"_id": {"$nin": existing_ids}}
-        
-        if user_progress and "completed_questions" in user_progress:
-            random_query["_id"]["$nin"].extend([ObjectId(q_id) for q_id in user_progress["completed_questions"]])
-            
-        cursor = db.questions.find(random_query).limit(count - len(questions))
-        additional_questions = await cursor.to_list(length=count - len(questions))
-        questions.extend(additional_questions)
-    
+    # Fallback tiers, in order of preference: the full query, the query without
+    # its topic filter, then any question the user hasn't completed yet
+    tier_queries = [query]
+    if "topic" in query:
+        tier_queries.append({k: v for k, v in query.items() if k != "topic"})
+    
+    # Every tier skips questions the user has already answered correctly
+    exclude_completed = exclude_completed_stages(db, user_id)
+    
+    # At most completed_count of a tier's candidates can be dropped as completed,
+    # so the top count + completed_count by priority normally contain `count`
+    # uncompleted questions if the tier has them. Limiting before the $lookup
+    # lets the server run a top-k sort and look up only that window.
+    completed_count = user_progress.get("completed_count") if user_progress else None
+    window = count + completed_count if completed_count is not None else None
+    
+    def tier_pipeline(tier_query: Dict, tier: int, window: Optional[int]) -> List[Dict]:
+        stages = [{"$match": tier_query}, {"$sort": dict(sort_criteria)}]
+        if window is not None:
+            stages.append({"$limit": window})
+        stages += exclude_completed
+        stages += [{"$limit": count}, {"$set": {"_tier": tier}}]
+        return stages
+    
+    def random_tier_pipeline(tier: int) -> List[Dict]:
+        # $sample as the first stage picks random documents without scanning the
+        # collection; oversample so enough remain once completed ones are dropped
+        stages = [{"$sample": {"size": count * RANDOM_TIER_OVERSAMPLE}}]
+        stages += exclude_completed
+        stages += [{"$limit": count}, {"$set": {"_tier": tier}}]
+        return stages
+    
+    # Each tier contributes at most `count` candidates; size the batch to
+    # that bound so every result arrives in the first reply
+    max_candidates = count * (len(tier_queries) + 1)
+    
+    async def fetch_candidates(window: Optional[int]) -> List[Dict]:
+        # Fetch every tier in a single round-trip; each $unionWith branch is its own
+        # sub-pipeline (so it can use indexes, unlike $facet) tagged with its tier
+        pipeline = tier_pipeline(tier_queries[0], 0, window)
+        for tier, tier_query in enumerate(tier_queries[1:], start=1):
+            pipeline.append({"$unionWith": {"coll": db.questions.name, "pipeline": tier_pipeline(tier_query, tier, window)}})
+        pipeline.append({"$unionWith": {
+            "coll": db.questions.name,
+            "pipeline": random_tier_pipeline(len(tier_queries))
+        }})
+        # Strip answer fields server-side; they're never sent to the client
+        pipeline.append({"$unset": sorted(SENSITIVE_QUESTION_FIELDS)})
+        return await db.questions.aggregate(pipeline, batchSize=max_candidates).to_list(length=max_candidates)
+    
+    candidates = await fetch_candidates(window)
+    
+    # completed_count can lag behind user_completions (e.g. a failed progress
+    # write), so a window can miss questions; if any windowed tier came back
+    # short, fetch again without the window
+    if window is not None:
+        tier_sizes = [0] * len(tier_queries)
+        for question in candidates:
+            if question["_tier"] < len(tier_queries):
+                tier_sizes[question["_tier"]] += 1
+        if min(tier_sizes) < count:
+            candidates = await fetch_candidates(None)
+    
+    # Merge tiers in order of preference, skipping duplicates, up to `count`
+    candidates.sort(key=lambda q: q["_tier"])
+    questions = []
+    seen_ids = set()
+    for question in candidates:
+        del question["_tier"]
+        if question["_id"] not in seen_ids:
+            seen_ids.add(question["_id"])
+            questions.append(question)
+            if len(questions) == count:
+                break
+    
+    if questions:
+        _next_questions_cache[cache_key] = questions
     return questions
 
 async def save_user_answer(
-    db: Database,
-    user_id: str,
-    question_id: str,
+    db: AsyncIOMotorDatabase,
+    user_id: ObjectId,
+    question_id: ObjectId,
     user_answer: Any,
-    time_taken: float = 0
+    time_taken: float = 0,
+    question: Optional[Dict] = None
 ) -> Dict:
     """
     Save the user's answer to a question and evaluate it.
+    Pass the already-fetched question document to skip re-reading it.
     """
     try:
-        # Convert string IDs to ObjectIds
-        user_object_id = ObjectId(user_id)
-        question_object_id = ObjectId(question_id)
-        
         # Get the question to check the answer
-        question = await db.questions.find_one({"_id": question_object_id})
+        if question is None:
+            question = await db.questions.find_one({"_id": question_id}, projection=GRADING_PROJECTION)
         if not question:
             raise ValueError("Question not found")
             
@@ -136,20 +246,21 @@ async def save_user_answer(
                 
         # Create answer record
         answer_record = {
-            "user_id": user_object_id,
-            "question_id": question_object_id,
+            "user_id": user_id,
+            "question_id": question_id,
             "user_answer": user_answer,
             "is_correct": is_correct,
             "time_taken": time_taken,
             "score": score,
-            "timestamp": datetime.utcnow()
+            "timestamp": datetime.now(timezone.utc)
         }
         
-        # Save the answer to the database
+        # Save the answer to the database; progress is only updated once the
+        # answer is recorded, so a failed insert never counts the attempt
         await db.user_answers.insert_one(answer_record)
         
         # Update user progress
-        await update_user_progress(
+        progress = await update_user_progress(
             db, 
             user_id=user_id, 
             question_id=question_id,
@@ -160,199 +271,239 @@ async def save_user_answer(
         return {
             "is_correct": is_correct,
             "feedback": feedback,
-            "score": score
+            "score": score,
+            "progress": progress
         }
     except Exception as e:
-        print(f"Error saving user answer: {e}")
+        logger.error("Error saving user answer: %s", e)
         raise
 
 async def update_user_progress(
-    db: Database,
-    user_id: str,
-    question_id: str,
+    db: AsyncIOMotorDatabase,
+    user_id: ObjectId,
+    question_id: ObjectId,
     question: Dict,
     is_correct: bool
-) -> None:
+) -> Dict:
     """
-    Update the user's progress based on their answer.
+    Update the user's progress based on their answer and return the updated progress.
     """
-    user_object_id = ObjectId(user_id)
-    
-    # Get or create user progress document
-    progress = await db.user_progress.find_one({"user_id": user_object_id})
-    
-    if not progress:
-        # Initialize new progress record
-        progress = {
-            "user_id": user_object_id,
-            "completed_questions": [],
-            "attempted_questions": [],
-            "correct_answers": 0,
-            "total_attempts": 0,
-            "skills": {},
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-    
-    # Update progress data
-    progress["total_attempts"] += 1
-    
-    if question_id not in progress["attempted_questions"]:
-        progress["attempted_questions"].append(question_id)
-    
-    if is_correct:
-        progress["correct_answers"] += 1
-        if question_id not in progress["completed_questions"]:
-            progress["completed_questions"].append(question_id)
+    now = datetime.now(timezone.utc)
+    correct_inc = 1 if is_correct else 0
+    
+    # Record the attempt in user_completions (one document per user and question,
+    # instead of ever-growing arrays on the progress document); the previous
+    # state tells us whether this is a first attempt or a first correct answer
+    previous = await db.user_completions.find_one_and_update(
+        {"user_id": user_id, "question_id": question_id},
+        {"$setOnInsert": {"first_attempted_at": now}, "$max": {"completed": is_correct}},
+        projection={"completed": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    newly_attempted = previous is None
+    newly_completed = is_correct and not (previous and previous.get("completed"))
+    
+    # Counters; missing fields start from their defaults, so the same pipeline
+    # also initializes a brand new progress record
+    pipeline = [{"$set": {
+        "created_at": {"$ifNull": ["$created_at", now]},
+        "updated_at": now,
+        "progress_version": {"$add": [{"$ifNull": ["$progress_version", 0]}, 1]},
+        "total_attempts": {"$add": [{"$ifNull": ["$total_attempts", 0]}, 1]},
+        "correct_answers": {"$add": [{"$ifNull": ["$correct_answers", 0]}, correct_inc]},
+        "attempted_count": {"$add": [{"$ifNull": ["$attempted_count", 0]}, int(newly_attempted)]},
+        "completed_count": {"$add": [{"$ifNull": ["$completed_count", 0]}, int(newly_completed)]},
+        "skills": {"$ifNull": ["$skills", {}]}
+    }}]
     
     # Update skills mastery
     skills = question.get("skills", [])
-    for skill in skills:
-        if skill not in progress["skills"]:
-            progress["skills"][skill] = {
-                "mastery_level": 0,
-                "attempts": 0,
-                "correct": 0
-            }
+    if skills:
+        pipeline.append({"$set": {
+            path: expr
+            for skill in skills
+            for path, expr in (
+                (f"skills.{skill}.attempts", {"$add": [{"$ifNull": [f"$skills.{skill}.attempts", 0]}, 1]}),
+                (f"skills.{skill}.correct", {"$add": [{"$ifNull": [f"$skills.{skill}.correct", 0]}, correct_inc]})
+            )
+        }})
         
-        progress["skills"][skill]["attempts"] += 1
-        if is_correct:
-            progress["skills"][skill]["correct"] += 1
-            
-        # Recalculate mastery level (0-100%)
-        attempts = progress["skills"][skill]["attempts"]
-        correct = progress["skills"][skill]["correct"]
-        if attempts > 0:
-            mastery = (correct / attempts) * 100
-            # Apply forgetting curve effect
-            decay_factor = 0.9  # Simple decay factor
-            old_mastery = progress["skills"][skill]["mastery_level"]
-            new_mastery = (old_mastery * decay_factor) + (mastery * (1 - decay_factor))
-            progress["skills"][skill]["mastery_level"] = new_mastery
-    
-    progress["updated_at"] = datetime.utcnow()
-    
-    # Update or insert the progress document
-    await db.user_progress.update_one(
-        {"user_id": user_object_id}, 
-        {"$set": progress}, 
-        upsert=True
+        # Recalculate mastery level (0-100%) from the incremented counts, applying
+        # the forgetting curve: new = old * decay + accuracy * (1 - decay)
+        decay_factor = 0.9  # Simple decay factor
+        pipeline.append({"$set": {
+            f"skills.{skill}.mastery_level": {"$add": [
+                {"$multiply": [{"$ifNull": [f"$skills.{skill}.mastery_level", 0]}, decay_factor]},
+                {"$multiply": [
+                    {"$divide": [f"$skills.{skill}.correct", f"$skills.{skill}.attempts"]},
+                    100 * (1 - decay_factor)
+                ]}
+            ]}
+            for skill in skills
+        }})
+    
+    # Materialize the performance summary read by calculate_user_performance:
+    # overall accuracy, plus skills ranked by mastery level (lowest first)
+    pipeline.append({"$set": {
+        "accuracy": {"$multiply": [{"$divide": ["$correct_answers", "$total_attempts"]}, 100]},
+        "_ranked_skills": {"$sortArray": {
+            "input": {"$map": {
+                "input": {"$objectToArray": "$skills"},
+                "as": "s",
+                "in": {
+                    "skill": "$$s.k",
+                    "mastery_level": {"$ifNull": ["$$s.v.mastery_level", 0]},
+                    "attempts": {"$ifNull": ["$$s.v.attempts", 0]}
+                }
+            }},
+            "sortBy": {"mastery_level": 1}
+        }}
+    }})
+    pipeline.append({"$set": {
+        "strengths": {"$slice": ["$_ranked_skills", -3]},
+        "weaknesses": {"$slice": ["$_ranked_skills", 3]}
+    }})
+    pipeline.append({"$unset": "_ranked_skills"})
+    
+    # Apply the whole update atomically in one round-trip (creating the record
+    # if needed) and get the updated document back
+    progress = await db.user_progress.find_one_and_update(
+        {"user_id": user_id},
+        pipeline,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    
+    return progress
 
-async def get_user_progress(db: Database, user_id: str) -> Dict:
+async def get_user_progress(db: AsyncIOMotorDatabase, user_id: ObjectId) -> Dict:
     """
     Get the user's learning progress.
+    Users without a progress record get an unsaved default; the record is
+    created by update_user_progress on their first answer.
     """
-    user_object_id = ObjectId(user_id)
-    progress = await db.user_progress.find_one({"user_id": user_object_id})
+    progress = await db.user_progress.find_one({"user_id": user_id})
     
     if not progress:
-        # Initialize default progress
+        # Default progress, kept in memory only
         progress = {
-            "user_id": user_object_id,
-            "completed_questions": [],
-            "attempted_questions": [],
+            "user_id": user_id,
+            "attempted_count": 0,
+            "completed_count": 0,
             "correct_answers": 0,
             "total_attempts": 0,
             "skills": {},
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
-        await db.user_progress.insert_one(progress)
     
     return progress
 
-async def calculate_user_performance(db: Database, user_id: str) -> Dict:
+async def calculate_user_performance(
+    db: AsyncIOMotorDatabase,
+    user_id: ObjectId,
+    progress: Optional[Dict] = None
+) -> Dict:
     """
     Calculate user performance metrics.
+    Pass an already-loaded progress document to skip re-reading it.
     """
-    progress = await get_user_progress(db, user_id)
+    if progress is None:
+        progress = await get_user_progress(db, user_id)
     
-    # Calculate basic metrics
     total_attempts = progress.get("total_attempts", 0)
-    correct_answers = progress.get("correct_answers", 0)
-    accuracy = 0
-    if total_attempts > 0:
-        accuracy = (correct_answers / total_attempts) * 100
-    
-    # Get skill strengths and weaknesses
-    skills = progress.get("skills", {})
-    skill_levels = []
-    
-    for skill, data in skills.items():
-        skill_levels.append({
-            "skill": skill,
-            "mastery_level": data.get("mastery_level", 0),
-            "attempts": data.get("attempts", 0)
-        })
-    
-    # Sort by mastery level
-    skill_levels.sort(key=lambda x: x["mastery_level"])
-    
-    strengths = skill_levels[-3:] if len(skill_levels) > 3 else skill_levels
-    weaknesses = skill_levels[:3] if len(skill_levels) > 0 else []
+    accuracy = progress.get("accuracy")
+    strengths = progress.get("strengths")
+    weaknesses = progress.get("weaknesses")
+    
+    # Progress records not updated since these fields were materialized
+    # fall back to computing them here
+    if accuracy is None:
+        correct_answers = progress.get("correct_answers", 0)
+        accuracy = (correct_answers / total_attempts) * 100 if total_attempts > 0 else 0
+    if strengths is None or weaknesses is None:
+        skill_levels = sorted(
+            (
+                {"skill": skill, "mastery_level": data.get("mastery_level", 0), "attempts": data.get("attempts", 0)}
+                for skill, data in progress.get("skills", {}).items()
+            ),
+            key=lambda x: x["mastery_level"]
+        )
+        strengths = skill_levels[-3:]
+        weaknesses = skill_levels[:3]
     
     return {
         "accuracy": accuracy,
         "total_questions_attempted": total_attempts,
-        "unique_questions_completed": len(progress.get("completed_questions", [])),
-        "unique_questions_attempted": len(progress.get("attempted_questions", [])),
+        "unique_questions_completed": progress.get("completed_count", 0),
+        "unique_questions_attempted": progress.get("attempted_count", 0),
         "strengths": strengths,
         "weaknesses": weaknesses
     }
 
 async def recommend_next_question(
-    db: Database,
-    user_id: str,
-    current_question_id: str,
-    result: Dict
+    db: AsyncIOMotorDatabase,
+    user_id: ObjectId,
+    current_question_id: ObjectId,
+    result: Dict,
+    current_question: Optional[Dict] = None
 ) -> str:
     """
     Recommend the next question based on the user's performance.
+    Pass the already-fetched current question to skip re-reading it.
     """
     # Get the current question to access related topics/skills
-    question = await get_question_by_id(db, current_question_id)
+    question = current_question
+    if question is None:
+        question = await get_question_by_id(db, current_question_id)
     if not question:
         # If question not found, return None
         return None
     
-    # Get user progress
-    progress = await get_user_progress(db, user_id)
+    # Stages that skip questions the user has already answered correctly
+    exclude_completed = exclude_completed_stages(db, user_id)
+    
+    # Rank of the current question, derived from its label if not stored
+    difficulty_rank = question.get("difficulty_rank") or DIFFICULTY_RANKS.get(question.get("difficulty", "medium"), DIFFICULTY_RANKS["medium"])
     
     # Recommendation strategy based on answer correctness
     if result["is_correct"]:
         # If correct, advance to a slightly harder question on the same topic
         query = {
             "topic": question.get("topic"),
-            "difficulty": {"$gt": question.get("difficulty", "medium")},
-            "_id": {"$ne": ObjectId(current_question_id)}
+            "difficulty_rank": {"$gt": difficulty_rank},
+            "_id": {"$ne": current_question_id}
         }
         
         # Exclude completed questions
-        if "completed_questions" in progress and progress["completed_questions"]:
-            query["_id"]["$nin"] = [ObjectId(q_id) for q_id in progress["completed_questions"]]
+        stages = exclude_completed
     else:
         # If incorrect, find a similar or slightly easier question on the same topic/skill
         query = {
             "topic": question.get("topic"),
-            "difficulty": {"$lte": question.get("difficulty", "medium")},
-            "_id": {"$ne": ObjectId(current_question_id)}
+            "difficulty_rank": {"$lte": difficulty_rank},
+            "_id": {"$ne": current_question_id}
         }
         
         # Target the specific skills the user got wrong
         if "skills" in question:
             query["skills"] = {"$in": question.get("skills", [])}
+        stages = []
+    
+    async def find_first_id(match: Dict, extra_stages: List[Dict]) -> Optional[Dict]:
+        # Only the id is returned to the caller
+        pipeline = [{"$match": match}, *extra_stages, {"$limit": 1}, {"$project": {"_id": 1}}]
+        matches = await db.questions.aggregate(pipeline, batchSize=1).to_list(length=1)
+        return matches[0] if matches else None
     
     # Find a matching question
-    next_question = await db.questions.find_one(query)
+    next_question = await find_first_id(query, stages)
     
     # If no matching question found, get any unanswered question
     if not next_question:
-        basic_query = {"_id": {"$ne": ObjectId(current_question_id)}}
-        if "completed_questions" in progress and progress["completed_questions"]:
-            basic_query["_id"]["$nin"] = [ObjectId(q_id) for q_id in progress["completed_questions"]]
-        
-        next_question = await db.questions.find_one(basic_query)
+        basic_query = {"_id": {"$ne": current_question_id}}
+        next_question = await find_first_id(basic_query, exclude_completed)
     
     return str(next_question["_id"]) if next_question else None
 
@@ -363,19 +514,19 @@ def format_question_response(question: Dict) -> Dict:
     if not question:
         return {}
     
-    # Clone the question to avoid modifying the original
-    response = dict(question)
+    # Copy only the fields safe to send to the client (question text, options,
+    # difficulty, etc.), leaving the original document untouched
+    response = {k: v for k, v in question.items() if k not in SENSITIVE_QUESTION_FIELDS}
     
     # Convert ObjectId to string
-    response["_id"] = str(response["_id"])
+    response["_id"] = str(question["_id"])
     
-    # Remove answers for client-side response
-    if "correct_answer" in response:
-        del response["correct_answer"]
-    
-    if "explanations" in response:
-        del response["explanations"]
-    
-    # Keep other fields like question text, options, difficulty, etc.
-    
-    return response
\ No newline at end of file
+    return response
+
+def format_progress_response(progress: Dict) -> Dict:
+    """
+    Format a progress record for API response, converting its ObjectIds to strings.
+    """
+    response = {k: v for k, v in progress.items() if k != "_id"}
+    response["user_id"] = str(progress["user_id"])
+    return response
@@ -0,0 +1,29 @@
+"""
+Set difficulty_rank on questions from their difficulty label, so that
+recommend_next_question can compare difficulties numerically.
+
+Safe to re-run; run again after loading new questions that lack the field.
+Run from the repository root:
+
+    python -m scripts.backfill_difficulty_rank
+"""
+import asyncio
+from app.database import database
+from app.qna.utils import DIFFICULTY_RANKS
+
+
+async def backfill_difficulty_rank():
+    updated = 0
+    for difficulty, rank in DIFFICULTY_RANKS.items():
+        result = await database.questions.update_many(
+            {"difficulty": difficulty, "difficulty_rank": {"$ne": rank}},
+            {"$set": {"difficulty_rank": rank}}
+        )
+        updated += result.modified_count
+
+    unranked = await database.questions.count_documents({"difficulty_rank": {"$exists": False}})
+    print(f"Set difficulty_rank on {updated} questions ({unranked} still without a known difficulty)")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_difficulty_rank())
@@ -0,0 +1,45 @@
+"""
+Remove duplicates that block the unique indexes created by init_indexes.
+
+- user_progress: keeps one document per user_id (the one with the most
+  attempts, then the oldest) and deletes the rest. Duplicates come from the
+  old get_user_progress racing two first requests into two inserts.
+- users: duplicate emails (from concurrent registrations) are only reported,
+  since each account may hold its own data; resolve them by hand.
+
+Run from the repository root, then restart the app so the indexes are built:
+
+    python -m scripts.dedupe_unique_keys
+"""
+import asyncio
+from app.database import database, users_collection
+
+
+async def find_duplicates(collection, key):
+    pipeline = [
+        {"$group": {"_id": f"${key}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    return [group["_id"] async for group in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+async def dedupe_unique_keys():
+    removed = 0
+    for user_id in await find_duplicates(database.user_progress, "user_id"):
+        documents = await database.user_progress.find({"user_id": user_id}).to_list(length=None)
+        documents.sort(key=lambda d: (-d.get("total_attempts", 0), d["_id"]))
+        extra_ids = [d["_id"] for d in documents[1:]]
+        result = await database.user_progress.delete_many({"_id": {"$in": extra_ids}})
+        removed += result.deleted_count
+    print(f"Removed {removed} duplicate user_progress documents")
+
+    duplicate_emails = await find_duplicates(users_collection, "email")
+    for email in duplicate_emails:
+        ids = [str(user["_id"]) async for user in users_collection.find({"email": email}, projection={"_id": 1})]
+        print(f"Duplicate users for {email}: {', '.join(ids)}")
+    if duplicate_emails:
+        print(f"{len(duplicate_emails)} emails have duplicate users; merge or delete them before restarting")
+
+
+if __name__ == "__main__":
+    asyncio.run(dedupe_unique_keys())
@@ -0,0 +1,60 @@
+"""
+One-time migration: move the attempted_questions / completed_questions arrays
+out of user_progress into the user_completions collection, replacing them
+with attempted_count / completed_count counters.
+
+Run from the repository root (after the app has created its indexes):
+
+    python -m scripts.migrate_user_completions
+"""
+import asyncio
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.database import database
+
+
+async def migrate_user_completions():
+    migrated = 0
+    now = datetime.now(timezone.utc)
+    progress_query = {"$or": [
+        {"attempted_questions": {"$exists": True}},
+        {"completed_questions": {"$exists": True}}
+    ]}
+
+    async for progress in database.user_progress.find(progress_query):
+        user_id = progress["user_id"]
+        # ObjectId() accepts both legacy hex strings and ObjectIds
+        completed = {ObjectId(q_id) for q_id in progress.get("completed_questions", [])}
+        attempted = {ObjectId(q_id) for q_id in progress.get("attempted_questions", [])} | completed
+
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "question_id": question_id},
+                {"$setOnInsert": {"first_attempted_at": now}, "$max": {"completed": question_id in completed}},
+                upsert=True
+            )
+            for question_id in attempted
+        ]
+        if operations:
+            await database.user_completions.bulk_write(operations, ordered=False)
+
+        # Count from user_completions rather than the arrays, so answers the new
+        # code recorded before this migration ran are included
+        attempted_count = await database.user_completions.count_documents({"user_id": user_id})
+        completed_count = await database.user_completions.count_documents({"user_id": user_id, "completed": True})
+
+        await database.user_progress.update_one(
+            {"_id": progress["_id"]},
+            {
+                "$set": {"attempted_count": attempted_count, "completed_count": completed_count},
+                "$unset": {"attempted_questions": "", "completed_questions": ""}
+            }
+        )
+        migrated += 1
+
+    print(f"Migrated {migrated} progress documents to user_completions")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_user_completions())